@@ -1,8 +1,11 @@
 from __future__ import annotations
 import numpy as np
-from scipy.io.wavfile import write
+from functools import lru_cache
+from math import exp2
 from typing import Optional
 import os
+import re
+import struct
 
 # Constants
 AMPLITUDE = 4096
@@ -23,11 +26,93 @@ TEMPOS = {
     "Andante": 75, "Moderato": 90, "Allegretto": 100, "Allegro": 120,
     "Vivace": 135, "Presto": 170, "Prestissimo": 180
 }
+# Lookup tables for every (pitch, octave) frequency and (tempo, duration symbol) length in seconds
+FREQ_TABLE = {
+    (pitch, octave): 262 * exp2(note_step / 12) * exp2(octave - 4)
+    for pitch, note_step in PITCH_CLASSES.items() for octave in range(10)
+}
+DURATION_SECONDS = {
+    (tempo, symbol): notation * (60 / tempo)
+    for tempo in TEMPOS.values() for symbol, notation in DURATION_MAP.items()
+}
+# One period of a full-scale 16-bit sine, indexed by the top SIN_LUT_BITS of a 32-bit phase accumulator
+SIN_LUT_BITS = 11
+SIN_LUT = np.round(32767 * np.sin(np.linspace(0, 2 * np.pi, 1 << SIN_LUT_BITS, endpoint=False))).astype(np.int16)
+# Layout of the RIFF/WAVE header for mono 16-bit PCM output
+WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+# Matches a single note token such as b"F4,DQN" or a rest such as b",QN"
+NOTE_RE = re.compile(rb'([A-Za-z]?)(\d)?\s*,([A-Z]+)')
 
 output_directory = "output_songs"
 if not os.path.exists(output_directory):
     os.makedirs(output_directory)
 
+def write_wav(filepath: str, rate: int, data: np.ndarray) -> None:
+    """
+    Writes mono 16-bit PCM samples to a WAV file.
+    The 44-byte RIFF header is packed with the precompiled WAV_HEADER since the total length
+    is known up front, and the sample buffer is written in one call without an extra copy.
+
+    :param filepath: The path of the WAV file to write.
+    :param rate: The sample rate in Hz.
+    :param data: A numpy array of int16 samples.
+    """
+    samples = np.ascontiguousarray(data, dtype='<i2')
+    header = WAV_HEADER.pack(b'RIFF', 36 + samples.nbytes, b'WAVE', b'fmt ', 16, 1, 1,
+                             rate, rate * 2, 2, 16, b'data', samples.nbytes)
+    with open(filepath, 'wb', buffering=1 << 20) as file:
+        file.write(header)
+        file.write(samples.data)
+
+@lru_cache(maxsize=256)
+def _generate_wave(frequency: float, num_samples: int, amplitude: int) -> np.ndarray:
+    """
+    Generates a sine wave array of 16-bit samples from the SIN_LUT wavetable, caching the result
+    so repeated notes share one buffer. The returned array is read-only; callers combining waves must copy it first.
+
+    :param frequency: The frequency of the wave in Hz.
+    :param num_samples: The length of the wave in samples.
+    :param amplitude: The amplitude of the wave.
+    :returns: A read-only int16 numpy array representing the wave.
+    """
+    if frequency == 0 or amplitude == 0:
+        samples = np.zeros(num_samples, dtype=np.int16)
+        samples.flags.writeable = False
+        return samples
+    # The phase advances by frequency / SAMPLERATE of a period per sample as a 32-bit fixed point
+    # fraction, which wraps around naturally; its top bits index the wavetable
+    phase = np.arange(num_samples, dtype=np.uint32)
+    phase *= np.uint32(int(frequency * 2 ** 32 / SAMPLERATE) % 2 ** 32)
+    phase >>= 32 - SIN_LUT_BITS
+    # Scaling is done in float and rounded to nearest once, so any amplitude works and no DC offset is added
+    wave = SIN_LUT[phase].astype(np.float32)
+    wave *= amplitude / 32767
+    np.rint(wave, out=wave)
+    np.clip(wave, -32768, 32767, out=wave)
+    samples = wave.astype(np.int16)
+    samples.flags.writeable = False
+    return samples
+
+def render_song(starts: np.ndarray, lengths: np.ndarray, frequencies: np.ndarray,
+                amplitudes: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Renders every note of a song straight into one output buffer in a single pass,
+    without building intermediate Wave objects.
+
+    :param starts: The start sample index of each note.
+    :param lengths: The length of each note in samples.
+    :param frequencies: The frequency of each note in Hz.
+    :param amplitudes: The amplitude of each note.
+    :param out: The zeroed int16 buffer the song is rendered into; rests are left untouched.
+    :returns: The out buffer.
+    """
+    for start, length, frequency, amplitude in zip(starts.tolist(), lengths.tolist(),
+                                                   frequencies.tolist(), amplitudes.tolist()):
+        if frequency == 0 or amplitude == 0:
+            continue
+        out[start:start + length] = _generate_wave(frequency, length, amplitude)
+    return out
+
 class Wave:
     def __init__(self, frequency: float, duration: float, amplitude: int = AMPLITUDE, data: Optional[np.ndarray] = None):
         """
@@ -42,6 +127,7 @@ class Wave:
         self.amplitude = amplitude
         self.frequency = frequency
         self.duration = duration
+        self.n_samples = int(SAMPLERATE * duration) if data is None else data.size
         self.data = self.generate_wave() if data is None else data
 
     def generate_wave(self) -> np.ndarray:
@@ -50,9 +136,7 @@ class Wave:
         
         :returns: A numpy array representing the note's wave.
         """
-        t = np.linspace(0, self.duration, int(SAMPLERATE * self.duration), endpoint=False)
-        wave = self.amplitude * np.sin(2 * np.pi * self.frequency * t)
-        return wave
+        return _generate_wave(self.frequency, self.n_samples, self.amplitude).view()
 
     def __add__(self, other: Wave) -> Wave:
         """
@@ -84,22 +168,21 @@ class Note:
         self.tempo = TEMPOS[tempo]
         self.frequency = self.calculate_frequency() if pitch else 0
         self.duration = self.calculate_duration()
+        self.n_samples = int(SAMPLERATE * self.duration)
         self.amplitude = amplitude if pitch else 0
-        self.wave = Wave(self.frequency, self.duration, self.amplitude)
 
     def calculate_frequency(self) -> float:
         """
         Calculates the frequency of the note based on its pitch and octave.
         Base note is C in fourth octave with frequency 262 Hz.
+        Pitches missing from PITCH_CLASSES are played as C.
         
         :returns: The frequency of the note in Hz.
         """
         if not self.pitch:
             return 0
-        base_frequency = 262
-        note_step = PITCH_CLASSES.get(self.pitch, 0)
-        octave_offset = self.octave - 4
-        return base_frequency * (2 ** (note_step / 12)) * (2 ** octave_offset)
+        pitch = self.pitch if self.pitch in PITCH_CLASSES else 'C'
+        return FREQ_TABLE[(pitch, self.octave)]
 
     def calculate_duration(self) -> float:
         """
@@ -107,16 +190,17 @@ class Note:
         
         :returns: The duration of the note in seconds.
         """
-        beats_per_second = 60 / self.tempo
-        duration_notation = DURATION_MAP[self.duration_symbol]
-        return duration_notation * beats_per_second
+        return DURATION_SECONDS[(self.tempo, self.duration_symbol)]
 
 class Piano:
     def __init__(self):
         """
         Initializes a Piano object to play musical notes.
+        Notes are stored as parallel lists of their frequencies, lengths in samples and amplitudes.
         """
-        self.notes = []
+        self.frequencies = []
+        self.lengths = []
+        self.amplitudes = []
 
     def add_note(self, note: Note) -> None:
         """
@@ -124,22 +208,22 @@ class Piano:
         
         :param note: The Note object to be added.
         """
-        self.notes.append(note)
+        self.frequencies.append(note.frequency)
+        self.lengths.append(note.n_samples)
+        self.amplitudes.append(note.amplitude)
 
     def get_combined_wave(self) -> np.ndarray:
         """
         Combines all notes in the piano into a single wave array.
         
-        :returns: A numpy array representing the combined wave of all notes sequentially.
+        :returns: An int16 numpy array representing the combined wave of all notes sequentially.
         """
-        total_length = sum(note.wave.data.size for note in self.notes)
-        combined_wave_data = np.zeros(total_length)
-        current_index = 0
-        for note in self.notes:
-            length = note.wave.data.size
-            combined_wave_data[current_index:current_index + length] = note.wave.data
-            current_index += length
-        return combined_wave_data
+        lengths = np.asarray(self.lengths, dtype=np.int64)
+        frequencies = np.asarray(self.frequencies, dtype=np.float64)
+        amplitudes = np.asarray(self.amplitudes, dtype=np.int64)
+        starts = np.cumsum(lengths) - lengths
+        combined_wave_data = np.zeros(lengths.sum(), dtype=np.int16)
+        return render_song(starts, lengths, frequencies, amplitudes, combined_wave_data)
 
 class Song:
     def __init__(self, filepath: str):
@@ -155,22 +239,27 @@ class Song:
     def load_and_play_song(self) -> None:
         """
         Loads notes from a file, adds them to the piano, and writes the resulting wave to a file.
+        The song is played once at the first tempo listed in the file.
+        A ValueError is raised for any token that is not a valid note.
         """
-        file = open(self.filepath, 'r')
-        tempos = file.readline().strip().split(',')
-        lines = file.readlines()
-        for tempo in tempos:
-            for line in lines:
-                line = line.strip()
-                if not line.startswith('"'):
-                    for note_info in line.strip().split('-'):
-                        if note_info:
-                            note, duration_symbol = note_info.split(',')
-                            pitch = note[0] if len(note) > 1 else None
-                            octave = int(note[1]) if pitch else 0
-                            note = Note(pitch, octave, duration_symbol, tempo)
-                            self.piano.add_note(note)
-        write(self.filename_output, SAMPLERATE, self.piano.get_combined_wave().astype(np.int16))
+        with open(self.filepath, 'rb') as file:
+            lines = file.read().splitlines()
+        tempo = lines[0].strip().decode().split(',')[0]
+        for line in lines[1:]:
+            if not line.strip().startswith(b'"'):
+                for token in line.split(b'-'):
+                    token = token.strip()
+                    if not token:
+                        continue
+                    match = NOTE_RE.fullmatch(token)
+                    if match is None:
+                        raise ValueError(f"Invalid note {token.decode(errors='replace')!r} in {self.filepath}")
+                    pitch, octave, duration_symbol = match.groups()
+                    pitch = pitch.decode() if pitch and octave else None
+                    octave = int(octave) if pitch else 0
+                    note = Note(pitch, octave, duration_symbol.decode(), tempo)
+                    self.piano.add_note(note)
+        write_wav(self.filename_output, SAMPLERATE, self.piano.get_combined_wave())
         print(f"Check the generated WAV file: {self.filename_output}")
 
 def main():
@@ -1,5 +1,8 @@
+import os
+import struct
+import tempfile
 import unittest
-from honors1 import Wave, SAMPLERATE as RATE
+from honors1 import Song, Wave, write_wav, AMPLITUDE, SAMPLERATE as RATE
 import numpy as np
 
 class TestWaveOperations(unittest.TestCase):
@@ -30,5 +33,54 @@ class TestWaveOperations(unittest.TestCase):
         expected_data[:min_length] = self.wave1.data[:min_length] * self.wave3.data[:min_length]
         self.assertTrue(np.allclose(result_wave.data, expected_data), "Multiplication does not match expected result")
 
+    def test_wavetable_matches_sine(self):
+        # The wavetable wave stays within about 16 LSB of the exact sine
+        expected = AMPLITUDE * np.sin(2 * np.pi * 440 * np.arange(self.wave1.data.size) / RATE)
+        self.assertEqual(self.wave1.data.size, int(RATE * 1.0))
+        self.assertLessEqual(np.abs(self.wave1.data - expected).max(), 16, "Wavetable wave deviates from the sine")
+
+    def test_wavetable_edge_cases(self):
+        # No DC offset, float amplitudes and negative frequencies are all supported
+        self.assertAlmostEqual(self.wave1.data.mean(), 0.0, delta=0.05)
+        quiet = Wave(frequency=440, duration=0.1, amplitude=2048.0)
+        self.assertLessEqual(np.abs(quiet.data).max(), 2048)
+        negative = Wave(frequency=-440, duration=1.0)
+        self.assertLessEqual(np.abs(negative.data + self.wave1.data).max(), 16, "Negative frequency should invert the wave")
+
+    def test_repeated_wave_is_cached(self):
+        # Waves with identical properties share one read-only buffer
+        self.assertTrue(np.shares_memory(self.wave1.data, self.wave2.data), "Repeated wave was regenerated")
+        self.assertFalse(self.wave1.data.flags.writeable, "Cached wave data should be read-only")
+
+    def test_rest_is_silent(self):
+        # A rest has no frequency and produces silence of the full duration
+        rest = Wave(frequency=0, duration=0.5)
+        self.assertEqual(rest.data.size, int(RATE * 0.5))
+        self.assertFalse(rest.data.any(), "Rest should be silent")
+
+    def test_write_wav(self):
+        # Header fields and sample payload of a mono 16-bit PCM file
+        samples = self.wave3.data
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "wave.wav")
+            write_wav(path, RATE, samples)
+            with open(path, 'rb') as file:
+                contents = file.read()
+        riff, size, wave, fmt, _, pcm, channels, rate, byte_rate, _, bits, data, data_size = \
+            struct.unpack('<4sI4s4sIHHIIHH4sI', contents[:44])
+        self.assertEqual((riff, wave, fmt, data), (b'RIFF', b'WAVE', b'fmt ', b'data'))
+        self.assertEqual((pcm, channels, rate, byte_rate, bits), (1, 1, RATE, RATE * 2, 16))
+        self.assertEqual((size, data_size), (36 + samples.size * 2, samples.size * 2))
+        self.assertTrue(np.array_equal(np.frombuffer(contents[44:], dtype='<i2'), samples), "Samples were not written unchanged")
+
+    def test_malformed_note_raises(self):
+        # A token that is not a note fails loudly instead of being skipped
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "song.txt")
+            with open(path, 'wb') as file:
+                file.write(b'Allegro\nC4,QN-D4QN-E4,QN\n')
+            with self.assertRaises(ValueError):
+                Song(path).load_and_play_song()
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,14 +1,19 @@
 from __future__ import annotations
 import numpy as np
-from scipy.io.wavfile import write
+from functools import lru_cache
+from math import exp2
 import os
-from typing import List, Optional, Tuple
+import re
+import struct
+from typing import List, Optional
 
 # Constants
 AMPLITUDE = 4096
 SAMPLERATE = 44100
 OVERTONE_FACTORS = [0.36046922, 0.50991279, 0.11674297, 0.01287502]
+OVERTONE_WEIGHTS = np.array(OVERTONE_FACTORS, dtype=np.float32)
 DECAY_COEFFICIENTS = [0.25656511, 1.64549261]
+ENVELOPE_OFFSET = np.log(AMPLITUDE) - DECAY_COEFFICIENTS[0]
 PITCH_CLASSES = {'C': 0, 'c': 1, 'D': 2, 'd': 3, 'E': 4, 'F': 5, 'f': 6, 'G': 7, 'g': 8, 'A': 9, 'a': 10, 'B': 11}
 DURATION_MAP = {
     "WN": 4.0, "DHN": 3.0, "DDHN": 3.5, "HN": 2.0, "HNT": 4.0/3, "QN": 1.0, "QNT": 2.0/3,
@@ -20,11 +25,95 @@ TEMPOS = {
     "Andante": 75, "Moderato": 90, "Allegretto": 100, "Allegro": 120,
     "Vivace": 135, "Presto": 170, "Prestissimo": 180
 }
+# Lookup tables for every (pitch, octave) frequency and (tempo, duration symbol) length in seconds
+FREQ_TABLE = {
+    (pitch, octave): 262 * exp2(note_step / 12) * exp2(octave - 4)
+    for pitch, note_step in PITCH_CLASSES.items() for octave in range(10)
+}
+DURATION_SECONDS = {
+    (tempo, symbol): notation * (60 / tempo)
+    for tempo in TEMPOS.values() for symbol, notation in DURATION_MAP.items()
+}
+# Layout of the RIFF/WAVE header for mono 16-bit PCM output
+WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+# Matches a single note token such as b"F4,DQN" or a rest such as b",QN"
+NOTE_RE = re.compile(rb'([A-Za-z]?)(\d)?\s*,([A-Z]+)')
 
 output_directory = "output_songs"
 if not os.path.exists(output_directory):
     os.makedirs(output_directory)
 
+def write_wav(filepath: str, rate: int, data: np.ndarray) -> None:
+    """
+    Writes mono 16-bit PCM samples to a WAV file.
+    The 44-byte RIFF header is packed with the precompiled WAV_HEADER since the total length
+    is known up front, and the sample buffer is written in one call without an extra copy.
+
+    :param filepath: The path of the WAV file to write.
+    :param rate: The sample rate in Hz.
+    :param data: A numpy array of int16 samples.
+    """
+    samples = np.ascontiguousarray(data, dtype='<i2')
+    header = WAV_HEADER.pack(b'RIFF', 36 + samples.nbytes, b'WAVE', b'fmt ', 16, 1, 1,
+                             rate, rate * 2, 2, 16, b'data', samples.nbytes)
+    with open(filepath, 'wb', buffering=1 << 20) as file:
+        file.write(header)
+        file.write(samples.data)
+
+@lru_cache(maxsize=256)
+def _generate_wave(frequency: float, num_samples: int, overtones: int) -> np.ndarray:
+    """
+    Generates the enveloped sum of overtones for a note quantized to 16-bit samples,
+    caching the result so repeated notes share one buffer. The returned array is read-only.
+
+    :param frequency: The frequency of the wave in Hz.
+    :param num_samples: The length of the wave in samples.
+    :param overtones: The number of overtones to sum.
+    :return: A read-only int16 numpy array representing the wave.
+    """
+    if frequency == 0:
+        samples = np.zeros(num_samples, dtype=np.int16)
+        samples.flags.writeable = False
+        return samples
+    wave = np.empty(num_samples, dtype=np.float32)
+    t = np.arange(num_samples, dtype=np.float32)
+    t *= 1.0 / SAMPLERATE
+    # The fundamental term (i = 0) is sin(0) == 0, so only overtones 1..n-1 are evaluated,
+    # all in a single sine call over a (n - 1, N) block reduced with one matrix-vector product.
+    harmonics = np.arange(1, overtones, dtype=np.float32)[:, None] * np.float32(2 * np.pi * frequency)
+    phase = harmonics * t[None, :]
+    sines = np.sin(phase, out=phase)
+    np.matmul(OVERTONE_WEIGHTS[1:overtones], sines, out=wave)
+    # t is no longer needed, so it is turned into the scaled envelope in place;
+    # AMPLITUDE is folded into the exponent so this takes a single exp pass
+    t *= -DECAY_COEFFICIENTS[1]
+    t += ENVELOPE_OFFSET
+    np.exp(t, out=t)
+    wave *= t
+    np.clip(wave, -32768, 32767, out=wave)
+    samples = wave.astype(np.int16)
+    samples.flags.writeable = False
+    return samples
+
+def render_notes(starts: np.ndarray, lengths: np.ndarray, frequencies: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """
+    Renders every note of a hand straight into one output buffer in a single pass,
+    adding each note's samples at its start index without building intermediate Wave objects.
+    Notes within a hand never overlap, so a plain slice add is used rather than np.add.at
+    or zero-padded full-length copies. Rests add nothing and are skipped.
+
+    :param starts: The start sample index of each note.
+    :param lengths: The length of each note in samples.
+    :param frequencies: The frequency of each note in Hz.
+    :param out: The buffer the notes are mixed into.
+    :return: The out buffer.
+    """
+    for start, length, frequency in zip(starts.tolist(), lengths.tolist(), frequencies.tolist()):
+        if frequency == 0:
+            continue
+        out[start:start + length] += _generate_wave(frequency, length, len(OVERTONE_FACTORS))
+    return out
+
 class Wave:
     def __init__(self, frequency: float, duration: float, data: Optional[np.ndarray] = None):
         """
@@ -36,6 +125,7 @@ class Wave:
         """
         self.frequency = frequency
         self.duration = duration
+        self.n_samples = int(SAMPLERATE * duration) if data is None else data.size
         self.data = data if data is not None else self.generate_wave()
 
     def generate_wave(self) -> np.ndarray:
@@ -44,12 +134,7 @@ class Wave:
 
         :return: A numpy array representing the note's wave.
         """
-        t = np.linspace(0, self.duration, int(SAMPLERATE * self.duration), endpoint=False)
-        envelope = np.exp(-DECAY_COEFFICIENTS[0] - DECAY_COEFFICIENTS[1] * t)
-        wave = np.zeros_like(t)
-        for i in range(4):
-            wave += AMPLITUDE * envelope * OVERTONE_FACTORS[i] * np.sin(2 * np.pi * i * self.frequency * t)
-        return wave
+        return _generate_wave(self.frequency, self.n_samples, len(OVERTONE_FACTORS)).view()
 
     def __add__(self, other: Wave) -> Wave:
         """
@@ -89,21 +174,20 @@ class Note:
         self.tempo = TEMPOS[tempo]
         self.frequency = self.calculate_frequency() if pitch else 0
         self.duration = self.calculate_duration()
-        self.wave = Wave(0, self.duration) if not pitch else Wave(self.frequency, self.duration)
+        self.n_samples = int(SAMPLERATE * self.duration)
 
     def calculate_frequency(self) -> float:
         """
         Calculates the frequency of the note based on its pitch and octave.
         Base note is C in fourth octave with frequency 262 Hz.
+        Pitches missing from PITCH_CLASSES are played as C.
         
         :returns: The frequency of the note in Hz.
         """
         if not self.pitch:
             return 0
-        base_frequency = 262
-        note_step = PITCH_CLASSES.get(self.pitch, 0)
-        octave_offset = self.octave - 4
-        return base_frequency * (2 ** (note_step / 12)) * (2 ** octave_offset)
+        pitch = self.pitch if self.pitch in PITCH_CLASSES else 'C'
+        return FREQ_TABLE[(pitch, self.octave)]
 
     def calculate_duration(self) -> float:
         """
@@ -111,9 +195,7 @@ class Note:
         
         :returns: The duration of the note in seconds.
         """
-        beats_per_second = 60 / self.tempo
-        duration_notation = DURATION_MAP[self.duration_symbol]
-        return duration_notation * beats_per_second
+        return DURATION_SECONDS[(self.tempo, self.duration_symbol)]
 
     def __str__(self) -> str:
         """
@@ -126,12 +208,18 @@ class Note:
 class Piano:
     def __init__(self):
         """
-        Initializes the Piano which manages two lists for left and right hand notes.
-        """
-        self.notes_left = []
-        self.notes_right = []
-        self.time_left = 0 
-        self.time_right = 0
+        Initializes the Piano which manages left and right hand notes.
+        Each hand stores parallel lists of note start indices, lengths in samples and frequencies,
+        along with the number of samples played so far.
+        """
+        self.starts_left = []
+        self.lengths_left = []
+        self.frequencies_left = []
+        self.starts_right = []
+        self.lengths_right = []
+        self.frequencies_right = []
+        self.samples_left = 0
+        self.samples_right = 0
 
     def add_note_left(self, note: Note) -> None:
         """
@@ -139,8 +227,10 @@ class Piano:
 
         :param note: The note to add.
         """
-        self.notes_left.append((note, self.time_left))
-        self.time_left += note.duration
+        self.starts_left.append(self.samples_left)
+        self.lengths_left.append(note.n_samples)
+        self.frequencies_left.append(note.frequency)
+        self.samples_left += note.n_samples
 
     def add_note_right(self, note: Note) -> None:
         """
@@ -148,45 +238,42 @@ class Piano:
 
         :param note: The note to add.
         """
-        self.notes_right.append((note, self.time_right))
-        self.time_right += note.duration
+        self.starts_right.append(self.samples_right)
+        self.lengths_right.append(note.n_samples)
+        self.frequencies_right.append(note.frequency)
+        self.samples_right += note.n_samples
 
     def get_combined_wave_array(self) -> np.ndarray:
         """
         Combines all notes from both hands into a single wave array.
+        Notes are accumulated in int32 so overlapping hands cannot overflow,
+        then saturated to int16 once.
 
-        :return: A numpy array representing the combined wave of all notes.
+        :return: An int16 numpy array representing the combined wave of all notes.
         """
-        max_duration = max(self.time_left, self.time_right)
-        final_wave = Wave(0, max_duration, np.zeros(int(SAMPLERATE * max_duration)))
+        max_samples = max(self.samples_left, self.samples_right)
+        final_wave = Wave(0, max_samples / SAMPLERATE, np.zeros(max_samples, dtype=np.int32))
 
-        final_wave = self.combine_notes(final_wave, self.notes_left)
-        final_wave = self.combine_notes(final_wave, self.notes_right)
+        final_wave = self.combine_notes(final_wave, self.starts_left, self.lengths_left, self.frequencies_left)
+        final_wave = self.combine_notes(final_wave, self.starts_right, self.lengths_right, self.frequencies_right)
 
-        return final_wave.data
+        return np.clip(final_wave.data, -32768, 32767, out=final_wave.data).astype(np.int16)
 
-    def combine_notes(self, final_wave: Wave, notes: List[Tuple[Note, float]]) -> Wave:
+    def combine_notes(self, final_wave: Wave, starts: List[int], lengths: List[int],
+                      frequencies: List[float]) -> Wave:
         """
         Combines notes from two hands together into a single wave.
         Each hand has the same total duration.
-        This function utilizes magic method __add__() of Wave class to combine waves.
+        The note lists are converted to arrays, which render_notes mixes in place into the data of final_wave.
         
         :param final_wave: The initial wave to start combining into.
-        :param notes: A list of notes along with their start times.
+        :param starts: The start sample index of each note.
+        :param lengths: The length of each note in samples.
+        :param frequencies: The frequency of each note in Hz.
         :return: A wave object representing the combination of all input notes.
         """
-        current_time = 0
-        for note, start_time in notes:
-            silence_duration = max(0, start_time - current_time)
-            silence_wave = Wave(0, silence_duration, np.zeros(int(SAMPLERATE * silence_duration)))
-            final_wave += silence_wave
-
-            note_wave_extended = np.zeros_like(final_wave.data)
-            start_index = int(SAMPLERATE * start_time)
-            note_wave_extended[start_index:start_index + len(note.wave.data)] = note.wave.data
-            note_wave_to_add = Wave(note.frequency, note.duration, note_wave_extended)
-            final_wave += note_wave_to_add
-            current_time = start_time + note.duration
+        render_notes(np.asarray(starts, dtype=np.int64), np.asarray(lengths, dtype=np.int64),
+                    np.asarray(frequencies, dtype=np.float64), final_wave.data)
         return final_wave
     
     def __str__(self) -> str:
@@ -195,7 +282,7 @@ class Piano:
         
         :returns: A string representation of the Piano object.
         """
-        return f"Piano(notes_left={self.notes_left}, notes_right={self.notes_right})" 
+        return f"Piano(notes_left={len(self.frequencies_left)}, notes_right={len(self.frequencies_right)})" 
 
 class Song:
     def __init__(self, filepath: str):
@@ -213,41 +300,43 @@ class Song:
         Loads the song data from a file, processes each line (for right and left hand) 
         to add notes to the each hand on piano, and plays the song by writing the combined wave to a WAV file.
         """
-        file = open(self.filepath, 'r')
-        tempos = file.readline().strip().split(',')
+        with open(self.filepath, 'rb') as file:
+            lines = file.read().splitlines()
+        tempos = lines[0].strip().decode().split(',')
         tempo_user = input(f"Select a tempo for {self.filepath[:-4]}: {', '.join(tempos)}\n")
         while tempo_user not in tempos:
             tempo_user = input(f"Invalid tempo. Select a tempo for {self.filepath[:-4]}: {', '.join(tempos)}\n")
-        lines = file.readlines()
-        
-        for i in range(0, len(lines), 3):
-            right_hand_notes = lines[i + 1].strip().split('-')
-            left_hand_notes = lines[i + 2].strip().split('-')
-            
-            self.process_notes(right_hand_notes, tempo_user, 'r')
-            self.process_notes(left_hand_notes, tempo_user, 'l')
-
-        write(self.filename_output, SAMPLERATE, self.piano.get_combined_wave_array().astype(np.int16))
+        for i in range(1, len(lines), 3):
+            self.process_notes(lines[i + 1], tempo_user, 'r')
+            self.process_notes(lines[i + 2], tempo_user, 'l')
+
+        write_wav(self.filename_output, SAMPLERATE, self.piano.get_combined_wave_array())
         print(f"Song played and saved to {self.filename_output}")
 
-    def process_notes(self, note_infos: List[str], tempo: str, hand: str):
+    def process_notes(self, line: bytes, tempo: str, hand: str):
         """
-        Processes each note information string to create and add notes to the each hand on piano.
+        Tokenizes a line of note information to create and add notes to the each hand on piano.
+        A ValueError is raised for any token that is not a valid note.
 
-        :param note_infos: List of note information strings.
+        :param line: A raw line of note information strings separated by '-'.
         :param tempo: The selected tempo for the notes.
         :param hand: Specifies whether the notes are for the left or right hand.
         """
-        for note_info in note_infos:
-            if note_info:
-                note, duration = note_info.split(',')
-                pitch = note[0] if len(note) > 1 else None
-                octave = int(note[1]) if pitch else 0
-                note = Note(pitch, octave, duration, tempo)
-                if hand == 'r':
-                    self.piano.add_note_right(note)
-                elif hand == 'l':
-                    self.piano.add_note_left(note)
+        for token in line.split(b'-'):
+            token = token.strip()
+            if not token:
+                continue
+            match = NOTE_RE.fullmatch(token)
+            if match is None:
+                raise ValueError(f"Invalid note {token.decode(errors='replace')!r} in {self.filepath}")
+            pitch, octave, duration = match.groups()
+            pitch = pitch.decode() if pitch and octave else None
+            octave = int(octave) if pitch else 0
+            note = Note(pitch, octave, duration.decode(), tempo)
+            if hand == 'r':
+                self.piano.add_note_right(note)
+            elif hand == 'l':
+                self.piano.add_note_left(note)
     
     def __str__(self) -> str:
         """
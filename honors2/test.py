@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+from honors2 import Note, Piano
+import numpy as np
+
+class TestPianoMixing(unittest.TestCase):
+    def setUp(self):
+        # A piano with a quarter note in each hand, starting at the same time
+        self.piano = Piano()
+        self.note = Note('A', 4, 'QN', 'Allegro')
+
+    def test_overlapping_hands_saturate(self):
+        # Two loud overlapping notes exceed int16 in the int32 accumulator and are clipped once
+        loud = np.full(self.note.n_samples, 30000, dtype=np.int16)
+        self.piano.add_note_right(self.note)
+        self.piano.add_note_left(self.note)
+        with mock.patch('honors2._generate_wave', return_value=loud):
+            combined = self.piano.get_combined_wave_array()
+        self.assertEqual(combined.dtype, np.int16)
+        self.assertTrue(np.all(combined == 32767), "Overlapping hands should saturate to int16")
+
+    def test_rests_are_silent(self):
+        # A rest followed by a note leaves silence for the duration of the rest
+        rest = Note(None, 0, 'QN', 'Allegro')
+        self.piano.add_note_right(rest)
+        self.piano.add_note_right(self.note)
+        combined = self.piano.get_combined_wave_array()
+        self.assertEqual(combined.size, rest.n_samples + self.note.n_samples)
+        self.assertFalse(combined[:rest.n_samples].any(), "Rest should be silent")
+        self.assertTrue(combined[rest.n_samples:].any(), "Note after the rest should be audible")
+
+    def test_start_indices_follow_sample_counts(self):
+        # Each note starts where the previous one ended, counted in samples
+        notes = [Note('C', 5, 'ENT', 'Allegretto') for _ in range(3)] + [Note('G', 4, 'DEN', 'Allegretto')]
+        for note in notes:
+            self.piano.add_note_right(note)
+        expected = np.cumsum([0] + [note.n_samples for note in notes[:-1]])
+        self.assertEqual(self.piano.starts_right, expected.tolist())
+        self.assertEqual(self.piano.samples_right, sum(note.n_samples for note in notes))
+
+if __name__ == '__main__':
+    unittest.main()